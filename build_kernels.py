@@ -0,0 +1,28 @@
+"""
+把kernels.py中的数值内核预编译（AOT）为扩展模块traffic_kernels
+
+用法：python build_kernels.py
+生成的扩展模块位于本目录，kernels.py导入时会优先使用它。
+修改kernels.py中的内核后需要重新构建，否则kernels.py会因版本标签不一致而改用JIT编译。
+"""
+import os
+
+from numba.pycc import CC
+
+import kernels
+
+cc = CC("traffic_kernels")
+cc.output_dir = os.path.dirname(os.path.abspath(__file__))
+cc.export("step_speeds", kernels.STEP_SPEEDS_SIG)(kernels._step_speeds)
+cc.export("front_distances", kernels.FRONT_DISTANCES_SIG)(kernels._front_distances)
+
+KERNEL_TAG = kernels.KERNEL_TAG
+
+
+@cc.export("kernel_tag", "int64()")
+def kernel_tag():
+    """构建时内核的版本标签（编译为常量）"""
+    return KERNEL_TAG
+
+if __name__ == "__main__":
+    cc.compile()
@@ -0,0 +1,232 @@
+"""
+数值计算内核（Numba编译）
+
+内核单独放在本模块中，修改main.py不会使编译缓存失效。各内核声明了显式签名，
+导入时即完成编译并缓存到__pycache__，之后的运行直接加载缓存，无需重新编译。
+部署时可预先执行一次 python -c "import kernels" 预热缓存。
+
+有CUDA设备时，速度更新还可以使用StepSpeedsCuda在GPU上执行（首次使用时才导入numba.cuda）。
+
+也可以执行 python build_kernels.py 把内核预编译（AOT）为扩展模块traffic_kernels，
+之后导入时直接使用预编译版本，完全没有JIT编译开销（预编译版本为单线程）。
+预编译模块带有版本标签，内核签名或源码修改后标签不再一致，此时自动改用JIT编译，需重新构建。
+"""
+import hashlib
+import inspect
+import warnings
+
+import numpy as np
+from numba import njit, prange
+
+LIGHT_GREEN = 0  # 绿灯状态编码，与main.py中的LIGHT_STATES一致
+
+# 前车距离用inf表示无前车，因此不能假设无inf/nan，其余快速数学优化均可开启
+FASTMATH = {"nsz", "arcp", "contract", "afn", "reassoc"}
+
+
+# 各内核的显式签名，JIT编译和AOT预编译共用
+STEP_SPEEDS_SIG = (
+    "void(float32[::1], float32[::1], float32[::1], float32[::1], "
+    "float32[::1], int8[::1], float32[::1], float32[::1])"
+)
+FRONT_DISTANCES_SIG = "void(float32[:, ::1], int8[::1], int8[::1], int8[::1], float32[::1])"
+
+
+def _speed_rule(v, max_speed, accel, decel, front_dist, light_state, light_dist, rnd):
+    """
+    单辆车的速度更新规则（CPU内核和CUDA内核共用）
+    :return: 更新后的速度
+    """
+    # 各项约束都写成“取上限的较小值”，只有选择没有分支，便于LLVM向量化；
+    # 后一项约束依赖前一项得到的速度，因此按顺序逐项取min，而不是对互相独立的候选值一次取min
+    # 1. 加速（已达最大速度的车辆保持原速）
+    v = max(v, min(v + accel, max_speed))
+
+    # 2. 减速（避免碰撞）：前车过近时速度不超过前车距离减1
+    # 速度为连续值（受前车距离约束后可为小数），不能按整数速度查表，直接计算即可
+    safe_distance = max(2.0, v * 1.5)  # 安全距离
+    front_cap = max(0.0, front_dist - 1.0) if front_dist < safe_distance else np.inf
+    v = min(v, front_cap)
+
+    # 3. 信号灯减速（黄灯或红灯）：在安全距离内且来不及停车时减速
+    decel_distance = (v * v) / (2 * decel)  # 安全减速距离
+    # 用按位与合并条件，避免短路求值引入分支
+    brake = ((light_state != LIGHT_GREEN) & (light_dist < safe_distance * 2)
+             & (light_dist < decel_distance))
+    v = max(0.0, v - decel) if brake else v
+
+    # 4. 随机波动（模拟驾驶员行为）：速度为0时max(0, v - 1)仍为0，无需再判断v > 0
+    v = max(0.0, v - 1.0) if rnd < 0.1 else v
+    return v
+
+
+speed_rule = njit(fastmath=FASTMATH, cache=True)(_speed_rule)
+
+
+def _step_speeds(speed, max_speed, accel, decel, front_dist, light_state, light_dist, rnd):
+    """
+    批量更新所有车辆速度（原地修改speed）
+    :param speed: 当前速度数组
+    :param max_speed: 最大速度数组
+    :param accel: 加速度数组
+    :param decel: 减速度数组
+    :param front_dist: 与前车距离数组（无前车时为inf）
+    :param light_state: 前方信号灯状态编码数组
+    :param light_dist: 到信号灯距离数组
+    :param rnd: [0, 1)均匀随机数数组，用于随机波动
+    """
+    # 每次迭代只读写第i辆车的数据（前车距离已预先算好），各线程之间没有共享写入
+    for i in prange(speed.shape[0]):
+        speed[i] = speed_rule(
+            speed[i], max_speed[i], accel[i], decel[i],
+            front_dist[i], light_state[i], light_dist[i], rnd[i]
+        )
+
+
+def _front_distances(pos, dir_code, dir_axis, dir_sign, out):
+    """
+    按方向并行计算每辆车与同方向前车的距离（结果写入out，无前车时为inf）
+    :param pos: 车辆位置数组，形状为(n, 2)
+    :param dir_code: 车辆方向编码数组
+    :param dir_axis: 各方向行驶所沿的坐标轴
+    :param dir_sign: 各方向的前进符号
+    :param out: 输出的前车距离数组
+    """
+    n_dirs = dir_axis.shape[0]
+    # 计数排序按方向分桶：一次遍历得到各方向车辆下标，同一方向的下标连续存放
+    start = np.zeros(n_dirs + 1, dtype=np.int64)
+    for i in range(dir_code.shape[0]):
+        start[dir_code[i] + 1] += 1
+    for d in range(n_dirs):
+        start[d + 1] += start[d]
+    fill = start[:n_dirs].copy()
+    bucket = np.empty(dir_code.shape[0], dtype=np.int32)
+    for i in range(dir_code.shape[0]):
+        bucket[fill[dir_code[i]]] = i
+        fill[dir_code[i]] += 1
+
+    # 四个进口道互不影响，每个方向由一个线程独立处理
+    for d in prange(n_dirs):
+        idx = bucket[start[d]:start[d + 1]]
+        m = idx.shape[0]
+        # 沿行驶方向的坐标，数值越大越靠前
+        s = np.empty(m, dtype=np.float32)
+        for k in range(m):
+            s[k] = pos[idx[k], dir_axis[d]] * dir_sign[d]
+        order = np.argsort(s, kind="mergesort")
+
+        # 从最前方的车辆向后扫描，坐标相同的车辆互不视为前车
+        front = np.float32(np.inf)
+        k = m - 1
+        while k >= 0:
+            v = s[order[k]]
+            while k >= 0 and s[order[k]] == v:
+                out[idx[order[k]]] = front - v
+                k -= 1
+            front = v
+
+
+def _kernel_tag():
+    """根据内核签名和源码计算版本标签（63位整数），用于判断预编译模块是否与当前内核一致"""
+    h = hashlib.sha256()
+    parts = (
+        STEP_SPEEDS_SIG, FRONT_DISTANCES_SIG, str(LIGHT_GREEN), str(sorted(FASTMATH)),
+        inspect.getsource(_speed_rule), inspect.getsource(_step_speeds), inspect.getsource(_front_distances),
+    )
+    for part in parts:
+        h.update(part.encode())
+    return int(h.hexdigest()[:15], 16)
+
+
+KERNEL_TAG = _kernel_tag()
+
+
+def _load_aot_kernels():
+    """
+    加载build_kernels.py生成的预编译内核
+    :return: (step_speeds, front_distances)，模块不存在或版本标签不一致时返回None
+    """
+    try:
+        import traffic_kernels
+    except ImportError:
+        return None
+    # 预编译函数不检查参数类型，签名不一致时会读错内存，因此标签不一致（或旧模块没有标签）时不能使用
+    kernel_tag = getattr(traffic_kernels, "kernel_tag", None)
+    if kernel_tag is None or kernel_tag() != KERNEL_TAG:
+        warnings.warn("预编译模块traffic_kernels与当前内核不一致，已改用JIT编译，请重新执行 python build_kernels.py")
+        return None
+    return traffic_kernels.step_speeds, traffic_kernels.front_distances
+
+
+# 优先使用build_kernels.py生成的预编译版本
+_aot_kernels = _load_aot_kernels()
+if _aot_kernels is not None:
+    step_speeds, front_distances = _aot_kernels
+else:
+    step_speeds = njit(STEP_SPEEDS_SIG, parallel=True, cache=True, fastmath=FASTMATH)(_step_speeds)
+    front_distances = njit(FRONT_DISTANCES_SIG, parallel=True, nogil=True, cache=True)(_front_distances)
+
+
+CUDA_BLOCK_SIZE = 128  # CUDA内核每个线程块的线程数
+# step_speeds各参数的数据类型（与STEP_SPEEDS_SIG一致），用于预先分配显存
+STEP_SPEEDS_DTYPES = (
+    np.float32, np.float32, np.float32, np.float32, np.float32, np.int8, np.float32, np.float32
+)
+
+cuda = None  # numba.cuda模块，首次使用CUDA时才导入，纯CPU运行不加载
+speed_rule_device = None
+_step_speeds_cuda_kernel = None
+
+
+def _load_cuda():
+    """导入numba.cuda并定义CUDA内核（只在第一次调用时执行）"""
+    global cuda, speed_rule_device, _step_speeds_cuda_kernel
+    if cuda is not None:
+        return
+    from numba import cuda as numba_cuda
+    cuda = numba_cuda
+    speed_rule_device = cuda.jit(device=True)(_speed_rule)
+
+    @cuda.jit
+    def kernel(speed, max_speed, accel, decel, front_dist, light_state, light_dist, rnd):
+        """每个CUDA线程更新一辆车的速度"""
+        i = cuda.grid(1)
+        if i < speed.shape[0]:
+            speed[i] = speed_rule_device(
+                speed[i], max_speed[i], accel[i], decel[i],
+                front_dist[i], light_state[i], light_dist[i], rnd[i]
+            )
+
+    _step_speeds_cuda_kernel = kernel
+
+
+def cuda_available():
+    """是否有可用的CUDA设备"""
+    _load_cuda()
+    return cuda.is_available()
+
+
+class StepSpeedsCuda:
+    """
+    step_speeds的CUDA版本，调用方式与step_speeds相同（原地修改speed）
+    显存缓冲区按车辆容量一次分配、每步复用；其余计算仍在CPU上进行，
+    因此输入数组每步仍需拷入显存，只把速度拷回主存
+    """
+    def __init__(self, capacity):
+        """
+        :param capacity: 最大车辆数（显存缓冲区长度）
+        """
+        _load_cuda()
+        self._buffers = [cuda.device_array(capacity, dtype=dtype) for dtype in STEP_SPEEDS_DTYPES]
+
+    def __call__(self, speed, max_speed, accel, decel, front_dist, light_state, light_dist, rnd):
+        n = speed.shape[0]
+        if n == 0:
+            return
+        args = (speed, max_speed, accel, decel, front_dist, light_state, light_dist, rnd)
+        d_args = [buf[:n] for buf in self._buffers]
+        for d_arr, arr in zip(d_args, args):
+            d_arr.copy_to_device(arr)
+        blocks = (n + CUDA_BLOCK_SIZE - 1) // CUDA_BLOCK_SIZE
+        _step_speeds_cuda_kernel[blocks, CUDA_BLOCK_SIZE](*d_args)
+        d_args[0].copy_to_host(speed)
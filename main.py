@@ -3,175 +3,320 @@ import matplotlib.pyplot as plt
 from matplotlib.animation import FuncAnimation
 import matplotlib.patches as patches
 import seaborn as sns
-from collections import defaultdict
 import time
+from scipy.spatial import cKDTree
+from kernels import step_speeds, StepSpeedsCuda, cuda_available, front_distances
 import matplotlib.font_manager as fm  # 添加字体管理模块
 
 # 设置支持中文的字体
 plt.rcParams['font.sans-serif'] = ['SimHei', 'Microsoft YaHei', 'WenQuanYi Micro Hei']  # 设置中文字体
 plt.rcParams['axes.unicode_minus'] = False  # 正常显示负号
 
-class TrafficLight:
-    """交通信号灯类"""
-    def __init__(self, cycle=60, green_ratio=0.5):
+# 方向编码：0=北, 1=南, 2=东, 3=西
+DIRECTIONS = ("north", "south", "east", "west")
+DIR_CODE = {direction: code for code, direction in enumerate(DIRECTIONS)}
+# 各方向行驶所沿的坐标轴（0=x, 1=y）及前进符号
+DIR_AXIS = np.array([1, 1, 0, 0], dtype=np.int8)
+DIR_SIGN = np.array([1, -1, 1, -1], dtype=np.int8)
+# 各方向单位速度对应的(x, y)位移
+VEL_TABLE = np.array([[0, 1], [0, -1], [1, 0], [-1, 0]], dtype=np.int8)
+
+COLLISION_DIST = 2.0  # 碰撞阈值
+PATH_LEN = 64  # 每辆车保留的最近路径点数
+
+# 信号灯状态编码：0=绿, 1=黄, 2=红
+LIGHT_STATES = ("green", "yellow", "red")
+LIGHT_CODE = {state: code for code, state in enumerate(LIGHT_STATES)}
+
+# 目标方向编码：0=直行, 1=左转, 2=右转
+TARGET_DIRECTIONS = ("straight", "left", "right")
+TARGET_CUM_PROBS = np.array([0.6, 0.85])  # 直行60%，左转25%，右转15%（累计概率分界）
+
+# 已离开车辆的记录格式
+VEHICLE_RECORD_DTYPE = np.dtype([
+    ("id", np.int32),
+    ("dir_code", np.int8),
+    ("entry_step", np.int32),
+    ("exit_step", np.int32),
+    ("wait_time", np.int32),
+    ("exited", np.bool_),  # True为正常驶出，False为发生碰撞
+])
+
+
+class TrafficLightArray:
+    """批量信号灯（SoA），一次调用推进所有信号灯的状态"""
+    def __init__(self, cycles, green_ratios, initial_states):
         """
-        初始化交通信号灯
-        :param cycle: 信号周期长度（秒）
-        :param green_ratio: 绿灯时间比例
+        初始化一组交通信号灯
+        :param cycles: 各信号灯的周期长度（秒）
+        :param green_ratios: 各信号灯的绿灯时间比例
+        :param initial_states: 各信号灯的初始状态 ('green', 'yellow', 'red')
         """
-        self.cycle = cycle
-        self.green_duration = int(cycle * green_ratio)
-        self.yellow_duration = 3  # 黄灯时间固定为3秒
-        self.red_duration = cycle - self.green_duration - self.yellow_duration
-        self.state = "green"  # 初始状态
-        self.timer = 0  # 当前状态计时器
-        
-    def update(self, step):
-        """更新信号灯状态"""
+        cycles = np.asarray(cycles, dtype=np.int32)
+        green = (cycles * np.asarray(green_ratios)).astype(np.int32)
+        yellow = np.full_like(cycles, 3)  # 黄灯时间固定为3秒
+        red = cycles - green - yellow
+        # 每行依次为绿、黄、红三种状态的持续时间
+        self.durations = np.stack([green, yellow, red], axis=1)
+        
+        # 状态编码与信号灯状态编码一致，直接供速度内核使用
+        self.state = np.array([LIGHT_CODE[s] for s in initial_states], dtype=np.int8)
+        self.timer = np.zeros(len(cycles), dtype=np.int32)  # 当前状态已持续的时间
+        
+    def __len__(self):
+        return len(self.state)
+        
+    def __getitem__(self, index):
+        return TrafficLight(self, index)
+        
+    def step(self):
+        """所有信号灯前进一步，到时的信号灯切换到下一状态"""
         self.timer += 1
+        dur = self.durations[np.arange(len(self.state)), self.state]
+        expired = self.timer >= dur
+        self.state[expired] = (self.state[expired] + 1) % len(LIGHT_STATES)
+        self.timer[expired] = 0
+        
+    def get_remaining_time(self):
+        """获取所有信号灯当前状态的剩余时间"""
+        return self.durations[np.arange(len(self.state)), self.state] - self.timer
+
+class TrafficLight:
+    """交通信号灯类（TrafficLightArray中单个信号灯的视图）"""
+    __slots__ = ("_lights", "_index")
+    
+    def __init__(self, lights, index):
+        """
+        :param lights: 信号灯所在的TrafficLightArray
+        :param index: 信号灯在数组中的下标
+        """
+        self._lights = lights
+        self._index = index
         
-        if self.state == "green" and self.timer >= self.green_duration:
-            self.state = "yellow"
-            self.timer = 0
-        elif self.state == "yellow" and self.timer >= self.yellow_duration:
-            self.state = "red"
-            self.timer = 0
-        elif self.state == "red" and self.timer >= self.red_duration:
-            self.state = "green"
-            self.timer = 0
+    @property
+    def green_duration(self):
+        return int(self._lights.durations[self._index, 0])
+    
+    @property
+    def yellow_duration(self):
+        return int(self._lights.durations[self._index, 1])
+    
+    @property
+    def red_duration(self):
+        return int(self._lights.durations[self._index, 2])
+    
+    @property
+    def cycle(self):
+        return int(self._lights.durations[self._index].sum())
             
     def get_state(self):
         """获取当前信号灯状态"""
-        return self.state
+        return LIGHT_STATES[self._lights.state[self._index]]
+    
+    def get_state_code(self):
+        """获取当前信号灯状态编码"""
+        return self._lights.state[self._index]
     
     def get_remaining_time(self):
         """获取当前状态剩余时间"""
-        if self.state == "green":
-            return self.green_duration - self.timer
-        elif self.state == "yellow":
-            return self.yellow_duration - self.timer
-        else:
-            return self.red_duration - self.timer
+        lights = self._lights
+        i = self._index
+        return int(lights.durations[i, lights.state[i]] - lights.timer[i])
 
-class Vehicle:
-    """车辆类"""
-    next_id = 0
-    
-    def __init__(self, direction, max_speed=5, acceleration=1, deceleration=2):
+class VehiclePool:
+    """车辆状态存储（SoA），每辆车占各状态数组中的一行"""
+    def __init__(self, max_vehicles=4096, path_len=PATH_LEN):
+        """
+        初始化车辆存储
+        :param max_vehicles: 同时存在的最大车辆数
+        :param path_len: 每辆车保留的最近路径点数
+        """
+        self.max_vehicles = max_vehicles
+        # 前n行为在用车辆，n之后的行即为空闲槽位
+        self.n = 0
+        self.next_id = 0  # 下一个可用的车辆编号，批量加入时按连续区间一次分配
+        # 各数组取满足取值范围的最窄类型，减少每步遍历和压缩时的内存带宽
+        self.vehicle_id = np.empty(max_vehicles, dtype=np.int32)
+        self.pos = np.empty((max_vehicles, 2), dtype=np.float32)
+        self.dir_code = np.empty(max_vehicles, dtype=np.int8)
+        self.target_dir_code = np.empty(max_vehicles, dtype=np.int8)
+        self.speed = np.empty(max_vehicles, dtype=np.float32)
+        self.max_speed = np.empty(max_vehicles, dtype=np.float32)
+        self.accel = np.empty(max_vehicles, dtype=np.float32)
+        self.decel = np.empty(max_vehicles, dtype=np.float32)
+        self.wait_time = np.empty(max_vehicles, dtype=np.int32)
+        self.entry_step = np.empty(max_vehicles, dtype=np.int32)
+        
+        # 行驶路径环形缓冲区：所有车辆每次写入同一列，列号为path_count % path_len
+        self.path_len = path_len
+        self.path_count = 0  # 已记录的路径点次数
+        self.path_xy = np.empty((max_vehicles, path_len, 2), dtype=np.float32)
+        self.path_start = np.empty(max_vehicles, dtype=np.int32)  # 车辆加入时的path_count
+        
+    def __len__(self):
+        return self.n
+        
+    def __getitem__(self, index):
+        if not 0 <= index < self.n:
+            raise IndexError(index)
+        return Vehicle(self, index)
+        
+    def free_slots(self):
+        """剩余空闲槽位数"""
+        return self.max_vehicles - self.n
+        
+    def add(self, start_pos, dir_code, target_dir_code, entry_step=0, max_speed=5,
+            acceleration=1, deceleration=2):
         """
-        初始化车辆
-        :param direction: 行驶方向 ('north', 'south', 'east', 'west')
+        在空闲槽位中批量加入一批新车
+        :param start_pos: 初始位置数组，形状为(k, 2)
+        :param dir_code: 行驶方向编码数组
+        :param target_dir_code: 目标方向编码数组
+        :param entry_step: 进入系统时的模拟步
         :param max_speed: 最大速度
         :param acceleration: 加速度
         :param deceleration: 减速度
+        :return: 新车辆在状态数组中的下标范围（slice）
         """
-        self.id = Vehicle.next_id
-        Vehicle.next_id += 1
-        self.direction = direction
-        self.max_speed = max_speed
-        self.speed = 0
-        self.acceleration = acceleration
-        self.deceleration = deceleration
-        self.position = None
-        self.path = []  # 车辆行驶路径
-        self.wait_time = 0  # 累计等待时间
-        self.entry_time = time.time()  # 进入系统时间
-        self.exit_time = None  # 离开系统时间
-        self.target_direction = self._get_target_direction()
-        
-    def _get_target_direction(self):
-        """随机生成目标方向（直行、左转、右转）"""
-        # 直行60%，左转25%，右转15%
-        r = np.random.random()
-        if r < 0.6:
-            return "straight"
-        elif r < 0.85:
-            return "left"
-        else:
-            return "right"
-            
-    def update_speed(self, front_vehicle_dist, light_state, light_dist):
+        k = len(dir_code)
+        new = slice(self.n, self.n + k)
+        self.vehicle_id[new] = np.arange(self.next_id, self.next_id + k)
+        self.pos[new] = start_pos
+        self.dir_code[new] = dir_code
+        self.target_dir_code[new] = target_dir_code
+        self.speed[new] = 0
+        self.max_speed[new] = max_speed
+        self.accel[new] = acceleration
+        self.decel[new] = deceleration
+        self.wait_time[new] = 0
+        self.entry_step[new] = entry_step
+        self.path_start[new] = self.path_count
+        self.next_id += k
+        self.n += k
+        return new
+        
+    def compact(self, alive):
         """
-        更新车辆速度
-        :param front_vehicle_dist: 与前车距离
-        :param light_state: 前方信号灯状态
-        :param light_dist: 到信号灯距离
+        按掩码一次性压缩车辆存储，使剩余车辆在数组前部连续存放
+        :param alive: 长度为当前车辆数的布尔数组，True表示保留
         """
-        # 1. 加速
-        if self.speed < self.max_speed:
-            self.speed = min(self.speed + self.acceleration, self.max_speed)
-            
-        # 2. 减速（避免碰撞）
-        safe_distance = max(2, self.speed * 1.5)  # 安全距离
-        if front_vehicle_dist is not None and front_vehicle_dist < safe_distance:
-            self.speed = max(0, min(self.speed, front_vehicle_dist - 1))
-            
-        # 3. 信号灯减速
-        if light_state == "red" or light_state == "yellow":
-            # 在安全距离外开始减速
-            if light_dist < safe_distance * 2:
-                # 计算安全减速距离
-                decel_distance = (self.speed ** 2) / (2 * self.deceleration)
-                if light_dist < decel_distance:
-                    self.speed = max(0, self.speed - self.deceleration)
-        
-        # 4. 随机波动（模拟驾驶员行为）
-        if np.random.random() < 0.1 and self.speed > 0:
-            self.speed = max(0, self.speed - 1)
-            
-    def move(self):
-        """根据速度移动车辆"""
-        if self.position is not None:
-            # 记录路径
-            self.path.append((self.position[0], self.position[1], time.time()))
-            
-            # 根据方向移动
-            if self.direction == "north":
-                self.position = (self.position[0], self.position[1] + self.speed)
-            elif self.direction == "south":
-                self.position = (self.position[0], self.position[1] - self.speed)
-            elif self.direction == "east":
-                self.position = (self.position[0] + self.speed, self.position[1])
-            elif self.direction == "west":
-                self.position = (self.position[0] - self.speed, self.position[1])
-                
-        # 记录等待时间
-        if self.speed == 0:
-            self.wait_time += 1
+        keep = np.flatnonzero(alive)
+        n_keep = len(keep)
+        for arr in (self.vehicle_id, self.pos, self.dir_code, self.target_dir_code, self.speed,
+                    self.max_speed, self.accel, self.decel, self.wait_time, self.entry_step,
+                    self.path_xy, self.path_start):
+            arr[:n_keep] = arr[keep]
+        self.n = n_keep
+        
+    def record_path(self):
+        """把所有车辆的当前位置写入路径缓冲区（覆盖最旧的路径点）"""
+        self.path_xy[:self.n, self.path_count % self.path_len] = self.pos[:self.n]
+        self.path_count += 1
+        
+    def get_path(self, index):
+        """
+        按时间顺序获取单辆车最近的路径点
+        :param index: 车辆在状态数组中的下标
+        :return: 形状为(k, 2)的路径点数组，k不超过path_len
+        """
+        k = min(self.path_count - int(self.path_start[index]), self.path_len)
+        slots = np.arange(self.path_count - k, self.path_count) % self.path_len
+        return self.path_xy[index, slots]
+
+class Vehicle:
+    """车辆类（VehiclePool中单辆车的只读视图，仅用于绘图和调试）"""
+    __slots__ = ("_pool", "_index")
+    
+    # 属性名 -> (状态数组名, 取值转换)
+    _FIELDS = {
+        "id": ("vehicle_id", int),
+        "direction": ("dir_code", DIRECTIONS.__getitem__),
+        "target_direction": ("target_dir_code", TARGET_DIRECTIONS.__getitem__),
+        "position": ("pos", lambda row: tuple(row.tolist())),
+        "speed": ("speed", float),
+        "max_speed": ("max_speed", float),
+        "acceleration": ("accel", float),
+        "deceleration": ("decel", float),
+        "wait_time": ("wait_time", int),
+        "entry_step": ("entry_step", int),
+    }
+
+    def __init__(self, pool, index):
+        """
+        :param pool: 车辆所在的VehiclePool
+        :param index: 车辆在状态数组中的下标
+        """
+        self._pool = pool
+        self._index = index
+
+    def __getattr__(self, name):
+        try:
+            array_name, convert = self._FIELDS[name]
+        except KeyError:
+            raise AttributeError(name) from None
+        return convert(getattr(self._pool, array_name)[self._index])
+    
+    @property
+    def path(self):
+        """最近的行驶路径点（按时间顺序）"""
+        return self._pool.get_path(self._index)
 
 class Intersection:
     """十字路口模拟系统"""
-    def __init__(self, road_length=100, lane_width=10, spawn_rate=0.05):
+    def __init__(self, road_length=100, lane_width=10, spawn_rate=0.05, max_vehicles=4096,
+                 seed=None, spawn_slots=1, use_cuda=False):
         """
         初始化十字路口
         :param road_length: 道路长度
         :param lane_width: 车道宽度
         :param spawn_rate: 车辆生成率
+        :param max_vehicles: 路网中同时存在的最大车辆数
+        :param seed: 随机数种子（None表示不固定）
+        :param spawn_slots: 每步的车辆生成机会数（每次机会以spawn_rate的概率生成一辆车）
+        :param use_cuda: 是否在GPU上更新车辆速度（需要CUDA设备，适合车辆数很多的模拟）
         """
         self.road_length = road_length
         self.lane_width = lane_width
         self.spawn_rate = spawn_rate
+        self.spawn_slots = spawn_slots
+        if use_cuda and not cuda_available():
+            raise RuntimeError("未检测到可用的CUDA设备")
+        self._step_speeds = StepSpeedsCuda(max_vehicles) if use_cuda else step_speeds
+        self.rng = np.random.default_rng(seed)
+        self.dt = 1.0  # 每个模拟步对应的时间（秒）
+        self.tick = 0  # 仿真时钟：当前模拟步，每步加1，只在输出时换算为秒
+        self.sim_start_wall = time.time()  # 创建模拟时的墙上时间，仅用于把模拟步换算为时间戳
         
         # 创建交通信号灯 (NS: 南北, EW: 东西)
-        self.light_NS = TrafficLight(cycle=60, green_ratio=0.5)
-        self.light_EW = TrafficLight(cycle=60, green_ratio=0.5)
-        
         # 初始状态：南北绿灯，东西红灯
-        self.light_NS.state = "green"
-        self.light_EW.state = "red"
-        
-        # 车辆存储
-        self.vehicles = []
-        self.removed_vehicles = []
+        self.lights = TrafficLightArray(
+            cycles=(60, 60), green_ratios=(0.5, 0.5), initial_states=("green", "red")
+        )
+        self.light_NS = self.lights[0]
+        self.light_EW = self.lights[1]
+        # 方向编码 -> 信号灯（dir_code >> 1 即信号灯下标：0=南北, 1=东西）
+        self.light_for_dir = (self.light_NS, self.light_NS, self.light_EW, self.light_EW)
+        
+        # 车辆状态存储（SoA）
+        self.pool = VehiclePool(max_vehicles)
+        # 速度内核每步使用的输入数组，预先分配一次，每步只使用前n个元素
+        self._front_dist = np.empty(max_vehicles, dtype=np.float32)
+        self._light_dist = np.empty(max_vehicles, dtype=np.float32)
+        self._rnd = np.empty(max_vehicles, dtype=np.float32)
+
+        # 已离开车辆的记录，每步追加一批，使用时再合并
+        self._removed_records = []
         
         # 统计数据
         self.stats = {
             "total_vehicles": 0,
-            "avg_wait_time": 0,
-            "avg_travel_time": 0,
-            "throughput": 0,
-            "queue_lengths": defaultdict(list)
+            "total_wait_time": 0,  # 驶出车辆的累计等待时间（步）
+            "total_travel_steps": 0,  # 驶出车辆的累计行程时间（步）
+            "throughput": 0
         }
+        # 各方向队列长度记录：每步一行（列为方向编码），容量不足时成倍扩展
+        self._queue_history = np.empty((1024, len(DIRECTIONS)), dtype=np.int32)
+        self._n_queue_records = 0
         
         # 道路边界
         self.road_boundaries = {
@@ -181,46 +326,59 @@ class Intersection:
             "west": (road_length//2 - lane_width//2, road_length//2 + lane_width//2)
         }
         
+        # 各方向（按方向编码）生成车辆的横向位置范围
+        self._spawn_bounds = np.array([self.road_boundaries[d] for d in DIRECTIONS], dtype=np.float64)
+        
         # 交叉口中心区域
         self.intersection_center = (road_length // 2, road_length // 2)
         self.intersection_size = lane_width * 1.5
         
     def spawn_vehicle(self):
-        """生成新车辆"""
-        if np.random.random() < self.spawn_rate:
-            direction = np.random.choice(["north", "south", "east", "west"])
-            
-            # 设置初始位置
-            if direction == "north":
-                start_x = np.random.uniform(
-                    self.road_boundaries["north"][0], 
-                    self.road_boundaries["north"][1]
-                )
-                start_pos = (start_x, 0)
-            elif direction == "south":
-                start_x = np.random.uniform(
-                    self.road_boundaries["south"][0], 
-                    self.road_boundaries["south"][1]
-                )
-                start_pos = (start_x, self.road_length)
-            elif direction == "east":
-                start_y = np.random.uniform(
-                    self.road_boundaries["east"][0], 
-                    self.road_boundaries["east"][1]
-                )
-                start_pos = (0, start_y)
-            else:  # west
-                start_y = np.random.uniform(
-                    self.road_boundaries["west"][0], 
-                    self.road_boundaries["west"][1]
-                )
-                start_pos = (self.road_length, start_y)
-                
-            vehicle = Vehicle(direction)
-            vehicle.position = start_pos
-            self.vehicles.append(vehicle)
-            self.stats["total_vehicles"] += 1
+        """按生成率批量生成新车辆"""
+        # 每步有spawn_slots次生成机会，生成数量服从二项分布
+        n_new = min(self.rng.binomial(self.spawn_slots, self.spawn_rate), self.pool.free_slots())
+        if n_new == 0:
+            return
+        # 一次取出所有新车所需的随机数：方向、横向位置、目标方向
+        r_dir, r_lateral, r_target = self.rng.random((3, n_new))
+        dir_code = (r_dir * len(DIRECTIONS)).astype(np.int8)
+        low, high = self._spawn_bounds[dir_code].T
+        lateral = low + r_lateral * (high - low)
+        
+        # 设置初始位置：沿行驶方向从道路起点出发，另一坐标为横向位置
+        rows = np.arange(n_new)
+        axis = DIR_AXIS[dir_code]
+        start_pos = np.empty((n_new, 2), dtype=np.float32)
+        start_pos[rows, axis] = np.where(DIR_SIGN[dir_code] > 0, 0, self.road_length)
+        start_pos[rows, 1 - axis] = lateral
+        
+        target_code = np.digitize(r_target, TARGET_CUM_PROBS)
+        self.pool.add(start_pos, dir_code, target_code, entry_step=self.tick)
+        self.stats["total_vehicles"] += n_new
             
+    @property
+    def n_vehicles(self):
+        """路网中的车辆数"""
+        return self.pool.n
+        
+    @property
+    def vehicles(self):
+        """路网中所有车辆的只读视图列表（仅用于绘图和调试）"""
+        return [self.pool[i] for i in range(self.pool.n)]
+
+    def wall_time(self, tick):
+        """
+        把模拟步换算为墙上时间戳（秒）
+        :param tick: 模拟步（标量或数组，如车辆记录中的entry_step/exit_step）
+        """
+        return self.sim_start_wall + tick * self.dt
+
+    def get_removed_vehicles(self):
+        """获取所有已离开车辆的记录（VEHICLE_RECORD_DTYPE结构化数组）"""
+        if not self._removed_records:
+            return np.empty(0, dtype=VEHICLE_RECORD_DTYPE)
+        return np.concatenate(self._removed_records)
+
     def is_in_intersection(self, pos):
         """检查位置是否在交叉口区域内"""
         x, y = pos
@@ -231,145 +389,187 @@ class Intersection:
                 
     def get_light_state(self, direction):
         """获取当前方向的信号灯状态"""
-        if direction in ["north", "south"]:
-            return self.light_NS.get_state()
-        else:
-            return self.light_EW.get_state()
+        return self.light_for_dir[DIR_CODE[direction]].get_state()
             
-    def get_distance_to_light(self, vehicle):
-        """计算车辆到信号灯的距离"""
-        x, y = vehicle.position
-        
-        if vehicle.direction == "north":
-            return self.road_length - y - self.road_length//2
-        elif vehicle.direction == "south":
-            return y - self.road_length//2
-        elif vehicle.direction == "east":
-            return self.road_length - x - self.road_length//2
-        else:  # west
-            return x - self.road_length//2
+    def get_distances_to_light(self):
+        """批量计算每辆车到信号灯的距离"""
+        n = self.n_vehicles
+        dir_code = self.pool.dir_code[:n]
+        # 沿行驶方向的坐标
+        along = self.pool.pos[np.arange(n), DIR_AXIS[dir_code]]
+        half = self.road_length // 2
+        return np.where(
+            DIR_SIGN[dir_code] > 0,
+            self.road_length - along - half,  # 北向、东向
+            along - half  # 南向、西向
+        )
             
-    def check_collision(self, vehicle):
-        """检查碰撞（简化版）"""
-        for other in self.vehicles:
-            if other.id != vehicle.id:
-                dist = np.sqrt((vehicle.position[0]-other.position[0])**2 + 
-                              (vehicle.position[1]-other.position[1])**2)
-                if dist < 2:  # 碰撞阈值
-                    return True
-        return False
-        
-    def check_exit(self, vehicle):
-        """检查车辆是否已离开系统"""
-        x, y = vehicle.position
-        if vehicle.direction == "north" and y > self.road_length:
-            return True
-        elif vehicle.direction == "south" and y < 0:
-            return True
-        elif vehicle.direction == "east" and x > self.road_length:
-            return True
-        elif vehicle.direction == "west" and x < 0:
-            return True
-        return False
-        
-    def get_front_vehicle_distance(self, vehicle):
-        """获取与前车的距离"""
-        min_dist = float('inf')
-        for other in self.vehicles:
-            if other.id != vehicle.id and other.direction == vehicle.direction:
-                # 计算同方向车辆距离
-                if vehicle.direction == "north":
-                    dist = other.position[1] - vehicle.position[1]
-                elif vehicle.direction == "south":
-                    dist = vehicle.position[1] - other.position[1]
-                elif vehicle.direction == "east":
-                    dist = other.position[0] - vehicle.position[0]
-                else:  # west
-                    dist = vehicle.position[0] - other.position[0]
-                    
-                if dist > 0 and dist < min_dist:
-                    min_dist = dist
-                    
-        return min_dist if min_dist != float('inf') else None
-        
-    def update(self, step):
-        """更新整个系统状态"""
+    def check_collision(self):
+        """批量检查碰撞（简化版），返回每辆车是否与其他车辆相撞"""
+        n = self.n_vehicles
+        pos = self.pool.pos[:n]
+        hit = np.zeros(n, dtype=bool)
+        if n < 2:
+            return hit
+        # 每步重建一次KD树，只取出距离不超过阈值的候选车对
+        tree = cKDTree(pos)
+        pairs = tree.query_pairs(COLLISION_DIST, output_type='ndarray')
+        # query_pairs包含恰好等于阈值的车对，这里保持严格小于的判定（比较距离平方，省去开方）
+        delta = pos[pairs[:, 0]] - pos[pairs[:, 1]]
+        dist2 = delta[:, 0] ** 2 + delta[:, 1] ** 2
+        pairs = pairs[dist2 < COLLISION_DIST ** 2]
+        hit[pairs.ravel()] = True
+        return hit
+        
+    def check_exit(self):
+        """批量检查车辆是否已离开系统"""
+        # 车辆只会沿行驶方向前进，越过任一道路边界即为驶出
+        pos = self.pool.pos[:self.n_vehicles]
+        return ((pos < 0) | (pos > self.road_length)).any(axis=1)
+        
+    def get_front_vehicle_distances(self):
+        """批量计算每辆车与同方向前车的距离（无前车时为inf，结果为复用缓冲区的视图）"""
+        n = self.n_vehicles
+        front_dists = self._front_dist[:n]
+        front_distances(self.pool.pos[:n], self.pool.dir_code[:n], DIR_AXIS, DIR_SIGN, front_dists)
+        return front_dists
+        
+    def update(self):
+        """更新整个系统状态（推进一个模拟步，时钟tick只由本方法递增）"""
+        step = self.tick
+
         # 更新信号灯
-        self.light_NS.update(step)
-        self.light_EW.update(step)
+        self.lights.step()
         
         # 生成新车辆
         self.spawn_vehicle()
         
-        # 更新每辆车
-        to_remove = []
-        for i, vehicle in enumerate(self.vehicles):
-            # 获取信号灯状态
-            light_state = self.get_light_state(vehicle.direction)
-            light_dist = self.get_distance_to_light(vehicle)
-            
-            # 获取前车距离
-            front_dist = self.get_front_vehicle_distance(vehicle)
-            
-            # 更新速度
-            vehicle.update_speed(front_dist, light_state, light_dist)
-            
-            # 移动车辆
-            vehicle.move()
-            
-            # 检查碰撞
-            if self.check_collision(vehicle):
-                # 发生碰撞，移除车辆
-                vehicle.exit_time = time.time()  # 设置退出时间
-                to_remove.append(i)
-                continue
-                
-            # 检查是否离开系统
-            if self.check_exit(vehicle):
-                vehicle.exit_time = time.time()
-                to_remove.append(i)
-                self.stats["throughput"] += 1
-                # 记录行程时间
-                travel_time = vehicle.exit_time - vehicle.entry_time
-                self.stats["avg_travel_time"] = (
-                    self.stats["avg_travel_time"] * (self.stats["throughput"] - 1) + travel_time
-                ) / self.stats["throughput"]
-                # 记录等待时间
-                self.stats["avg_wait_time"] = (
-                    self.stats["avg_wait_time"] * (self.stats["throughput"] - 1) + vehicle.wait_time
-                ) / self.stats["throughput"]
-        
-        # 移除离开的车辆
-        for i in sorted(to_remove, reverse=True):
-            self.removed_vehicles.append(self.vehicles.pop(i))
-            
+        pool = self.pool
+        n = pool.n
+
+        # 批量计算前车距离
+        front_dists = self.get_front_vehicle_distances()
+
+        # 获取各车前方信号灯状态及距离
+        dir_code = pool.dir_code[:n]
+        light_state = self.lights.state[dir_code >> 1]
+        light_dist = self._light_dist[:n]
+        light_dist[:] = self.get_distances_to_light()
+        rnd = self.rng.random(dtype=np.float32, out=self._rnd[:n])
+
+        # 批量更新速度
+        speed = pool.speed[:n]
+        self._step_speeds(
+            speed, pool.max_speed[:n], pool.accel[:n], pool.decel[:n],
+            front_dists, light_state, light_dist, rnd
+        )
+
+        # 记录路径，然后批量移动车辆
+        pool.record_path()
+        pool.pos[:n] += VEL_TABLE[dir_code] * speed[:, None]
+
+        # 记录等待时间
+        pool.wait_time[:n] += speed == 0
+
+        # 检查碰撞（发生碰撞的车辆直接移除）及驶出系统的车辆
+        # 注意：这里是同步更新，所有车辆移动完毕后统一检查碰撞；原版逐车移动并立即检查，
+        # 后移动的车辆看到的是已移动车辆的新位置。判定时机不同会使更多车辆被判为碰撞而非驶出：
+        # 在__main__的参数下（500步）每轮移除的车辆总数基本不变（约233辆），
+        # 但驶出数量由原版的约75辆降到约50辆，通行量相关指标不能与原版直接比较
+        collided = self.check_collision()
+        exited = self.check_exit() & ~collided
+        alive = ~(collided | exited)
+        to_remove = np.flatnonzero(~alive)
+
+        # 累计驶出车辆的行程时间和等待时间，平均值在获取指标时再计算
+        n_exited = int(np.count_nonzero(exited))
+        if n_exited:
+            self.stats["throughput"] += n_exited
+            self.stats["total_travel_steps"] += int((step - pool.entry_step[:n][exited]).sum())
+            self.stats["total_wait_time"] += int(pool.wait_time[:n][exited].sum())
+
+        # 记录并移除离开的车辆
+        if len(to_remove):
+            record = np.empty(len(to_remove), dtype=VEHICLE_RECORD_DTYPE)
+            record["id"] = pool.vehicle_id[to_remove]
+            record["dir_code"] = pool.dir_code[to_remove]
+            record["entry_step"] = pool.entry_step[to_remove]
+            record["exit_step"] = step  # 设置退出时间
+            record["wait_time"] = pool.wait_time[to_remove]
+            record["exited"] = exited[to_remove]
+            self._removed_records.append(record)
+            pool.compact(alive)
+
         # 记录队列长度
         self._record_queue_lengths()
         
+        self.tick += 1
+        
     def _record_queue_lengths(self):
         """记录各方向队列长度"""
-        queues = {"north": 0, "south": 0, "east": 0, "west": 0}
-        
-        for vehicle in self.vehicles:
-            # 只统计在信号灯前等待的车辆
-            light_dist = self.get_distance_to_light(vehicle)
-            if light_dist < 30 and vehicle.speed == 0:  # 在30单位内且停止
-                queues[vehicle.direction] += 1
-                
-        for direction, length in queues.items():
-            self.stats["queue_lengths"][direction].append(length)
+        n = self.n_vehicles
+        # 只统计在信号灯前等待的车辆：在30单位内且停止
+        queued = (self.get_distances_to_light() < 30) & (self.pool.speed[:n] == 0)
+        queues = np.bincount(self.pool.dir_code[:n][queued], minlength=len(DIRECTIONS))
+        
+        k = self._n_queue_records
+        if k == len(self._queue_history):
+            self._queue_history = np.concatenate([self._queue_history, np.empty_like(self._queue_history)])
+        self._queue_history[k] = queues
+        self._n_queue_records = k + 1
+        
+    def get_queue_lengths(self):
+        """获取各方向队列长度记录，形状为(步数, 方向数)，列为方向编码"""
+        return self._queue_history[:self._n_queue_records]
             
+    def _average_metrics(self):
+        """
+        由累计统计量计算平均指标（不涉及队列长度记录，开销与模拟步数无关）
+        :return: (通行量, 平均等待时间（步）, 平均行程时间（秒）)
+        """
+        throughput = self.stats["throughput"]
+        if not throughput:
+            return 0, 0, 0
+        avg_wait = self.stats["total_wait_time"] / throughput
+        avg_travel = self.stats["total_travel_steps"] * self.dt / throughput
+        return throughput, avg_wait, avg_travel
+
     def get_efficiency_metrics(self):
         """获取效率指标"""
+        throughput, avg_wait, avg_travel = self._average_metrics()
+        history = self.get_queue_lengths()
         return {
-            "throughput": self.stats["throughput"],
-            "avg_wait_time": self.stats["avg_wait_time"],
-            "avg_travel_time": self.stats["avg_travel_time"],
-            "queue_lengths": self.stats["queue_lengths"]
+            "throughput": throughput,
+            "avg_wait_time": avg_wait,
+            "avg_travel_time": avg_travel,
+            "queue_lengths": {d: history[:, code].tolist() for code, d in enumerate(DIRECTIONS)}
         }
         
-    def visualize(self, steps=1000, interval=50):
-        """可视化模拟过程"""
+    def run(self, steps=1000, mode="fast", render_every=0, interval=50):
+        """
+        运行模拟
+        :param steps: 模拟步数
+        :param mode: 'fast'为不绘图直接运行（用于批量实验），'animate'为边模拟边绘制动画
+        :param render_every: fast模式下每隔多少步记录一帧车辆位置，运行结束后回放（0表示不记录）
+        :param interval: 动画帧间隔（毫秒）
+        """
+        if mode == "animate":
+            return self.visualize(steps=steps, interval=interval)
+        if mode != "fast":
+            raise ValueError(f"未知的运行模式: {mode}")
+        
+        # 模拟过程中只复制车辆位置，不涉及任何绘图
+        frames = []
+        for _ in range(steps):
+            self.update()
+            if render_every and self.tick % render_every == 0:
+                frames.append(self.pool.pos[:self.n_vehicles].copy())
+        
+        if frames:
+            return self.replay(frames, interval=interval)
+
+    def _draw_scene(self):
+        """创建画布并绘制静态的道路和交叉口"""
         fig, ax = plt.subplots(figsize=(10, 10))
         
         # 绘制道路
@@ -402,74 +602,130 @@ class Intersection:
         ax.set_aspect('equal')
         ax.set_title("十字路口交通流模拟")
         
-        # 车辆点
+        return fig, ax
+
+    def replay(self, frames, interval=50):
+        """
+        回放预先记录的车辆位置
+        :param frames: 每帧车辆位置数组的列表，数组形状为(车辆数, 2)
+        :param interval: 帧间隔（毫秒）
+        """
+        fig, ax = self._draw_scene()
         vehicle_dots = ax.scatter([], [], s=50, c='blue')
         
-        # 信号灯指示器
+        def update(frame):
+            vehicle_dots.set_offsets(frames[frame])
+            return vehicle_dots,
+        
+        ani = FuncAnimation(fig, update, frames=len(frames), interval=interval, blit=True, repeat=False)
+        
+        plt.tight_layout()
+        plt.show()
+        return ani
+
+    def visualize(self, steps=1000, interval=50, physics_per_frame=1):
+        """
+        可视化模拟过程
+        :param steps: 模拟步数
+        :param interval: 帧间隔（毫秒）
+        :param physics_per_frame: 每绘制一帧推进的模拟步数
+        """
+        fig, ax = self._draw_scene()
+        
+        # 车辆点（每帧变化，标记为动画元素，不绘入静态背景）
+        vehicle_dots = ax.scatter([], [], s=50, c='blue', animated=True)
+        
+        # 信号灯指示器（倒计时每步变化，同样单独绘制）
         light_text = ax.text(
             self.road_length - 20, 
             self.road_length - 20, 
             "",
             fontsize=12,
-            bbox=dict(facecolor='white', alpha=0.8)
+            bbox=dict(facecolor='white', alpha=0.8),
+            animated=True
         )
         
-        # 效率指标
+        # 效率指标（同样单独绘制，数值变化时无需整幅重绘）
         metrics_text = ax.text(
             10, 
             self.road_length - 20, 
             "",
             fontsize=10,
-            bbox=dict(facecolor='white', alpha=0.8)
+            bbox=dict(facecolor='white', alpha=0.8),
+            animated=True
         )
         
-        def init():
-            vehicle_dots.set_offsets(np.empty((0, 2)))
-            return vehicle_dots,
-        
-        def update(frame):
-            # 更新模拟
-            self.update(frame)
+        # 静态背景（道路和交叉口），只在整幅重绘后截取
+        background = None
+        # 上一帧显示的数值，未变化时不重新设置文字，避免重复排版
+        last_light = None
+        last_throughput = None
+        frame = 0
+        n_frames = -(-steps // physics_per_frame)  # 向上取整
+        
+        def draw_animated():
+            """在缓存的背景上只重绘动画元素"""
+            ax.draw_artist(vehicle_dots)
+            ax.draw_artist(light_text)
+            ax.draw_artist(metrics_text)
+        
+        def on_draw(event):
+            """整幅重绘（首次显示、窗口缩放）后重新截取背景"""
+            nonlocal background
+            background = fig.canvas.copy_from_bbox(ax.bbox)
+            draw_animated()
+        
+        def update():
+            nonlocal frame, last_light, last_throughput
+            if frame >= n_frames:
+                timer.stop()
+                return
             
-            # 更新车辆位置
-            positions = np.array([v.position for v in self.vehicles])
-            if len(positions) > 0:
-                vehicle_dots.set_offsets(positions)
-            else:
-                vehicle_dots.set_offsets(np.empty((0, 2)))
+            # 更新模拟：每帧推进若干步，模拟速度不受绘图速度限制
+            first_step = frame * physics_per_frame
+            for _ in range(min(physics_per_frame, steps - first_step)):
+                self.update()
+            frame += 1
+            
+            # 更新车辆位置（直接传入位置数组的视图，set_offsets内部会自行复制，无需额外拷贝）
+            vehicle_dots.set_offsets(self.pool.pos[:self.n_vehicles])
             
             # 更新信号灯状态
-            ns_state = self.light_NS.get_state()
-            ew_state = self.light_EW.get_state()
-            light_info = (
-                f"南北灯: {ns_state} ({self.light_NS.get_remaining_time()}s)\n"
-                f"东西灯: {ew_state} ({self.light_EW.get_remaining_time()}s)"
-            )
-            light_text.set_text(light_info)
+            # 一次取出两组信号灯的状态编码和剩余时间（0=南北, 1=东西）
+            light = (*self.lights.state.tolist(), *self.lights.get_remaining_time().tolist())
+            if light != last_light:
+                last_light = light
+                ns_code, ew_code, ns_remaining, ew_remaining = light
+                light_info = (
+                    f"南北灯: {LIGHT_STATES[ns_code]} ({ns_remaining}s)\n"
+                    f"东西灯: {LIGHT_STATES[ew_code]} ({ew_remaining}s)"
+                )
+                light_text.set_text(light_info)
             
-            # 更新效率指标
-            metrics = self.get_efficiency_metrics()
-            metrics_info = (
-                f"通行量: {metrics['throughput']}\n"
-                f"平均等待: {metrics['avg_wait_time']:.1f}步\n"
-                f"平均行程: {metrics['avg_travel_time']:.1f}s"
-            )
-            metrics_text.set_text(metrics_info)
+            # 更新效率指标（平均值只在有车辆驶出时变化）
+            # 只计算平均指标，不调用get_efficiency_metrics，避免每帧复制整段队列长度记录
+            if self.stats["throughput"] != last_throughput:
+                last_throughput, avg_wait, avg_travel = self._average_metrics()
+                metrics_info = (
+                    f"通行量: {last_throughput}\n"
+                    f"平均等待: {avg_wait:.1f}步\n"
+                    f"平均行程: {avg_travel:.1f}s"
+                )
+                metrics_text.set_text(metrics_info)
             
-            return vehicle_dots, light_text, metrics_text
-        
-        ani = FuncAnimation(
-            fig, 
-            update, 
-            frames=steps,
-            init_func=init,
-            interval=interval,
-            blit=True
-        )
+            if background is not None:
+                fig.canvas.restore_region(background)
+                draw_animated()
+                fig.canvas.blit(ax.bbox)
+        
+        fig.canvas.mpl_connect('draw_event', on_draw)
+        timer = fig.canvas.new_timer(interval=interval)
+        timer.add_callback(update)
+        timer.start()
         
         plt.tight_layout()
         plt.show()
-        return ani
+        return timer
     
     def plot_metrics(self):
         """绘制效率指标图表并分别保存为独立文件"""
@@ -540,10 +796,8 @@ class Intersection:
         plt.close()
     
         # 3. 通行量分布饼图
-        throughput_data = []
-        for vehicle in self.removed_vehicles:
-            if vehicle.exit_time:  # 确保有退出时间
-                throughput_data.append(vehicle.direction)
+        removed = self.get_removed_vehicles()
+        throughput_data = [DIRECTIONS[code] for code in removed["dir_code"]]
     
         if throughput_data:  # 确保有数据
             plt.figure(figsize=(8, 6))
@@ -580,7 +834,7 @@ class Intersection:
         plt.close()
     
         # 4. 行程时间分布直方图
-        travel_times = [v.exit_time - v.entry_time for v in self.removed_vehicles if v.exit_time is not None]
+        travel_times = ((removed["exit_step"] - removed["entry_step"]) * self.dt).tolist()
         if travel_times:  # 确保有数据
             plt.figure(figsize=(10, 6))
             # 使用KDE曲线和直方图结合
@@ -90,7 +90,8 @@ class Vehicle:
         else:
             return "right"
             
-    def update_speed(self, front_vehicle_dist, light_state, light_dist):
+    def update_speed(self, front_vehicle_dist, light_state, light_dist,
+                     _min=min, _max=max, _random=np.random.random):  # 绑定为局部变量，省去全局查找
         """
         更新车辆速度
         :param front_vehicle_dist: 与前车距离
@@ -99,12 +100,12 @@ class Vehicle:
         """
         # 1. 加速
         if self.speed < self.max_speed:
-            self.speed = min(self.speed + self.acceleration, self.max_speed)
+            self.speed = _min(self.speed + self.acceleration, self.max_speed)
             
         # 2. 减速（避免碰撞）
-        safe_distance = max(2, self.speed * 1.5)  # 安全距离
+        safe_distance = _max(2, self.speed * 1.5)  # 安全距离
         if front_vehicle_dist is not None and front_vehicle_dist < safe_distance:
-            self.speed = max(0, min(self.speed, front_vehicle_dist - 1))
+            self.speed = _max(0, _min(self.speed, front_vehicle_dist - 1))
             
         # 3. 信号灯减速
         if light_state == "red" or light_state == "yellow":
@@ -113,17 +114,18 @@ class Vehicle:
                 # 计算安全减速距离
                 decel_distance = (self.speed ** 2) / (2 * self.deceleration)
                 if light_dist < decel_distance:
-                    self.speed = max(0, self.speed - self.deceleration)
+                    self.speed = _max(0, self.speed - self.deceleration)
         
         # 4. 随机波动（模拟驾驶员行为）
-        if np.random.random() < 0.1 and self.speed > 0:
-            self.speed = max(0, self.speed - 1)
+        if _random() < 0.1 and self.speed > 0:
+            self.speed = _max(0, self.speed - 1)
             
-    def move(self):
+    def move(self, _time=time.time):  # 绑定为局部变量，省去属性查找
         """根据速度移动车辆"""
+        # 旧版脚本有意保留每步读取时钟记录路径时间戳（main.py中已改用模拟步）
         if self.position is not None:
             # 记录路径
-            self.path.append((self.position[0], self.position[1], time.time()))
+            self.path.append((self.position[0], self.position[1], _time()))
             
             # 根据方向移动
             if self.direction == "north":
@@ -86,19 +86,20 @@ class Vehicle:
             return "right"
 
     # 实时更新车辆的行驶速度
-    def update_speed(self, front_vehicle_dist, light_state, light_dist):
+    def update_speed(self, front_vehicle_dist, light_state, light_dist,
+                     _min=min, _max=max, _int=int):  # 绑定为局部变量，省去全局查找
         # front_vehicle_dist: 和牵扯距离
         # light_state: 前方信号等状态
         # light_dist: 到前方信号灯的距离
 
         # 1. 加速策略
         if self.speed < self.max_speed:
-            self.speed = min(self.speed+self.max_speed, self.max_speed)
+            self.speed = _min(self.speed + self.acceleration, self.max_speed)
 
         # 2. 减速策略（对车子而言）
-        safe_distance = max(2, int(self.speed * 1.5)) # 计算相关的安全距离
+        safe_distance = _max(2, _int(self.speed * 1.5)) # 计算相关的安全距离
         if front_vehicle_dist is not None and front_vehicle_dist < safe_distance:
-            self.speed = max(0, min(self.speed, front_vehicle_dist-1))
+            self.speed = _max(0, _min(self.speed, front_vehicle_dist-1))
 
         # 3. 遇到信号灯减速策略
         if light_state == "red" or light_state == "yellow":
@@ -107,13 +108,14 @@ class Vehicle:
                 # 计算安全减速距离
                 decel_distance = (self.speed ** 2) / (2 * self.deceleration)
                 if light_dist < decel_distance:
-                    self.speed = max(0, self.speed - self.deceleration)
+                    self.speed = _max(0, self.speed - self.deceleration)
         
-    def move(self):
+    def move(self, _time=time.time):  # 绑定为局部变量，省去属性查找
+        # 旧版脚本有意保留每步读取时钟记录路径时间戳（main.py中已改用模拟步）
         #
         if self.position is not None:
             # 记录路径
-            self.path.append((self.position[0], self.position[1], time.time()))
+            self.path.append((self.position[0], self.position[1], _time()))
 
             # 根据方向移动
             if self.direction == "north":
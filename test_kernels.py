@@ -0,0 +1,95 @@
+"""
+数值内核正确性检查：与逐车计算的参考实现对比
+
+用法：python test_kernels.py（也可以用pytest运行）
+"""
+import numpy as np
+
+from kernels import front_distances, step_speeds
+
+DIR_AXIS = np.array([1, 1, 0, 0], dtype=np.int8)  # 与main.py一致：南北沿y轴，东西沿x轴
+DIR_SIGN = np.array([1, -1, 1, -1], dtype=np.int8)
+
+
+def reference_front_distances(pos, dir_code):
+    """逐对比较的前车距离（原版get_front_vehicle_distance的做法），无前车时为inf"""
+    n = len(dir_code)
+    out = np.full(n, np.inf, dtype=np.float32)
+    for i in range(n):
+        d = dir_code[i]
+        axis, sign = DIR_AXIS[d], DIR_SIGN[d]
+        for j in range(n):
+            if j != i and dir_code[j] == d:
+                dist = pos[j, axis] * np.float32(sign) - pos[i, axis] * np.float32(sign)
+                if 0 < dist < out[i]:
+                    out[i] = dist
+    return out
+
+
+def reference_update_speed(v, max_speed, accel, decel, front_dist, light_state, light_dist, rnd):
+    """原版Vehicle.update_speed的逐车规则（随机数改为参数传入，无前车时front_dist为inf）"""
+    # 1. 加速
+    if v < max_speed:
+        v = min(v + accel, max_speed)
+
+    # 2. 减速（避免碰撞）
+    safe_distance = max(2, v * 1.5)
+    if front_dist < safe_distance:
+        v = max(0, min(v, front_dist - 1))
+
+    # 3. 信号灯减速
+    if light_state != 0 and light_dist < safe_distance * 2:
+        decel_distance = (v ** 2) / (2 * decel)
+        if light_dist < decel_distance:
+            v = max(0, v - decel)
+
+    # 4. 随机波动
+    if rnd < 0.1 and v > 0:
+        v = max(0, v - 1)
+    return v
+
+
+def test_front_distances(trials=200, seed=0):
+    """随机位置（含坐标相同的车辆）下与逐对比较的结果一致"""
+    rng = np.random.default_rng(seed)
+    for t in range(trials):
+        n = int(rng.integers(0, 60))
+        if t % 2:
+            # 整数网格上的位置，制造大量坐标相同的车辆
+            pos = rng.integers(0, 20, size=(n, 2)).astype(np.float32)
+        else:
+            pos = (rng.random((n, 2)) * 200).astype(np.float32)
+        dir_code = rng.integers(0, 4, size=n).astype(np.int8)
+        out = np.empty(n, dtype=np.float32)
+        front_distances(pos, dir_code, DIR_AXIS, DIR_SIGN, out)
+        np.testing.assert_array_equal(out, reference_front_distances(pos, dir_code))
+
+
+def test_step_speeds(trials=50, n=500, seed=0):
+    """随机输入下与原版逐车速度规则的结果一致"""
+    rng = np.random.default_rng(seed)
+    for _ in range(trials):
+        speed = (rng.random(n) * 6).astype(np.float32)
+        max_speed = (rng.random(n) * 3 + 3).astype(np.float32)
+        accel = (rng.random(n) * 0.5 + 0.5).astype(np.float32)
+        decel = (rng.random(n) * 1.0 + 1.0).astype(np.float32)
+        front_dist = (rng.random(n) * 20).astype(np.float32)
+        front_dist[rng.random(n) < 0.3] = np.inf  # 部分车辆无前车
+        light_state = rng.integers(0, 3, size=n).astype(np.int8)
+        light_dist = (rng.random(n) * 30).astype(np.float32)
+        rnd = rng.random(n, dtype=np.float32)
+
+        expected = np.array([
+            reference_update_speed(*args)
+            for args in zip(speed.tolist(), max_speed.tolist(), accel.tolist(), decel.tolist(),
+                            front_dist.tolist(), light_state.tolist(), light_dist.tolist(), rnd.tolist())
+        ])
+        step_speeds(speed, max_speed, accel, decel, front_dist, light_state, light_dist, rnd)
+        np.testing.assert_allclose(speed, expected, rtol=1e-5, atol=1e-5)
+
+
+if __name__ == "__main__":
+    test_front_distances()
+    print("front_distances 与逐对比较结果一致")
+    test_step_speeds()
+    print("step_speeds 与逐车速度规则结果一致")